@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 """登录获取 accessToken 与 userId，并拼接 WebSocket URL."""
 
+import functools
 import logging
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from urllib.parse import quote, urlparse
 
 import config
@@ -16,6 +17,57 @@ try:
 except ImportError:
     _AIOHTTP_OK = False
 
+# 可选：orjson 编解码更快，未安装时回退到标准库 json
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# 复用的 HTTP 会话：重连时多次登录可复用连接池中的 TCP/TLS 连接
+_session: Optional["aiohttp.ClientSession"] = None
+
+
+def _get_session() -> "aiohttp.ClientSession":
+    """懒创建并返回共享的 aiohttp 会话（需在事件循环内调用）。"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=4, ttl_dns_cache=300, keepalive_timeout=60)
+        _session = aiohttp.ClientSession(connector=connector)
+    return _session
+
+
+async def close_session() -> None:
+    """关闭共享的 aiohttp 会话，退出前调用。"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+@functools.lru_cache(maxsize=4)
+def _ws_endpoint(login_url: str) -> tuple[str, str, int]:
+    """由 LOGIN_URL 解析出 WebSocket 的 (scheme, host, port)。LOGIN_URL 进程内不变，解析结果缓存。"""
+    parsed = urlparse(login_url)
+    host = parsed.hostname or "localhost"
+    port = parsed.port
+    if port is None:
+        port = 443 if parsed.scheme == "https" else 80
+    scheme = "wss" if parsed.scheme == "https" else "ws"
+    return scheme, host, port
+
+
+@functools.lru_cache(maxsize=8)
+def _quote_token(token: str) -> str:
+    """对 token 做 URL 编码；token 仅在重新登录时变化，故缓存。"""
+    return quote(token)
+
+
 # 登录返回格式: { "code": 200, "data": { "accessToken": "", "userInfo": { "id": 2, ... } }, "message": "..." }
 
 
@@ -37,14 +89,18 @@ async def login() -> Optional[dict[str, Any]]:
         logger.warning("未配置 CURSOR_LOGIN_USERNAME / CURSOR_LOGIN_PASSWORD，跳过登录")
         return None
     try:
-        async with aiohttp.ClientSession() as session:
-            payload = {"username": username, "password": password}
-            async with session.post(config.LOGIN_URL, json=payload) as resp:
-                if resp.status != 200:
-                    text = await resp.text()
-                    logger.error("登录失败 HTTP %s: %s", resp.status, text[:200])
-                    return None
-                data = await resp.json()
+        session = _get_session()
+        payload = {"username": username, "password": password}
+        async with session.post(
+            config.LOGIN_URL,
+            data=_json_dumps(payload),
+            headers={"Content-Type": "application/json"},
+        ) as resp:
+            if resp.status != 200:
+                text = await resp.text()
+                logger.error("登录失败 HTTP %s: %s", resp.status, text[:200])
+                return None
+            data = _json_loads(await resp.read())
         if not isinstance(data, dict):
             logger.error("登录响应格式异常: %s", type(data))
             return None
@@ -83,20 +139,15 @@ def build_ws_url(login_result: Optional[dict[str, Any]]) -> str:
         if login_result and login_result.get("token"):
             base = config.WS_URL
             sep = "&" if "?" in base else "?"
-            return f"{base}{sep}token={quote(login_result['token'])}"
+            return f"{base}{sep}token={_quote_token(login_result['token'])}"
         return config.WS_URL
     if not login_result or not login_result.get("token") or login_result.get("userId") is None:
         # 无登录信息时无法拼接，返回默认
         return config.WS_URL or "ws://127.0.0.1:8080"
-    parsed = urlparse(config.LOGIN_URL)
-    host = parsed.hostname or "localhost"
-    port = parsed.port
-    if port is None:
-        port = 443 if parsed.scheme == "https" else 80
-    scheme = "wss" if parsed.scheme == "https" else "ws"
+    scheme, host, port = _ws_endpoint(config.LOGIN_URL)
     path = config.WS_PATH.rstrip("/")
     user_id = login_result["userId"]
-    token = quote(login_result["token"])
+    token = _quote_token(login_result["token"])
     url = f"{scheme}://{host}:{port}{path}/{user_id}?token={token}"
     return url
 
@@ -106,4 +157,20 @@ def build_ws_url_with_token(ws_base_url: str, token: Optional[str]) -> str:
     if not token:
         return ws_base_url
     sep = "&" if "?" in ws_base_url else "?"
-    return f"{ws_base_url}{sep}token={quote(token)}"
+    return f"{ws_base_url}{sep}token={_quote_token(token)}"
+
+
+def make_ws_url_provider(login_result: Optional[dict[str, Any]]) -> Callable[[], str]:
+    """
+    返回无参函数，调用时得到 WebSocket URL：首次调用时 build_ws_url 拼接并缓存，之后直接返回。
+    供 WS 客户端在（重）连接时取地址；重新登录成功后应以新的登录结果重新创建。
+    """
+    url: Optional[str] = None
+
+    def provider() -> str:
+        nonlocal url
+        if url is None:
+            url = build_ws_url(login_result)
+        return url
+
+    return provider
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 """配置：WebSocket 地址、Cursor 路径等"""
 
+import functools
 import os
+from dataclasses import dataclass
 from pathlib import Path
 
 try:
@@ -10,31 +12,36 @@ try:
 except ImportError:
     pass
 
-# 从环境变量读取，默认值供本地开发
-# WebSocket: ws://<后端地址>/ws/ai-tool，无需登录与 token，不再需要 projectId
-BACKEND_ADDRESS = os.getenv("CURSOR_BACKEND_ADDRESS", "43.139.194.139/aiProject")  # 仅 host:port，如 localhost:8080
-WS_URL = os.getenv("CURSOR_WS_URL", "")  # 若配置则直接使用，否则用 BACKEND_ADDRESS + /ws/ai-tool 拼接
-# Cursor 可执行文件路径（若在 PATH 中可写 cursor）
-CURSOR_EXE = os.getenv("CURSOR_EXE", "cursor")
-# 连接重试间隔（秒）
-RECONNECT_INTERVAL = float(os.getenv("RECONNECT_INTERVAL", "5"))
-# 等待 Cursor 窗口/输入框就绪的超时（秒）
-CURSOR_UI_TIMEOUT = int(os.getenv("CURSOR_UI_TIMEOUT", "15"))
-# 发送提示词的热键（Cursor Agent/Chat 面板默认用 Enter 发送，Shift+Enter 换行）
-# 若你的 Cursor 版本不同，可在 .env 中覆盖，如 CURSOR_SEND_HOTKEY=Ctrl+Enter
-CURSOR_SEND_HOTKEY = os.getenv("CURSOR_SEND_HOTKEY", "Enter")
-# 打开新 Agent 的热键（Cursor 中为 Ctrl+Shift+L）
-CURSOR_OPEN_AGENT_HOTKEY = os.getenv("CURSOR_OPEN_AGENT_HOTKEY", "Ctrl+Shift+L")
-
-# 项目根目录（用于默认工作目录）
-PROJECT_ROOT = Path(__file__).resolve().parent
 
+@dataclass(frozen=True, slots=True)
+class Config:
+    """启动时从环境变量读取的一份只读配置快照。"""
 
-def get_ws_url() -> str:
-    """得到 WebSocket 地址：ws://<后端地址>/ws/ai-tool（不再带 projectId）。"""
-    if WS_URL:
-        return WS_URL
-    base = BACKEND_ADDRESS.strip()
+    # WebSocket: ws://<后端地址>/ws/ai-tool，无需登录与 token，不再需要 projectId
+    backend_address: str  # 仅 host:port，如 localhost:8080
+    ws_url: str  # 若配置则直接使用，否则用 backend_address + /ws/ai-tool 拼接
+    resolved_ws_url: str  # 最终使用的 WebSocket 地址（已拼接好）
+    # Cursor 可执行文件路径（若在 PATH 中可写 cursor）
+    cursor_exe: str
+    # 连接重试间隔（秒）
+    reconnect_interval: float
+    # 等待 Cursor 窗口/输入框就绪的超时（秒）
+    cursor_ui_timeout: int
+    # 发送提示词的热键（Cursor Agent/Chat 面板默认用 Enter 发送，Shift+Enter 换行）
+    cursor_send_hotkey: str
+    # 打开新 Agent 的热键（Cursor 中为 Ctrl+Shift+L）
+    cursor_open_agent_hotkey: str
+    # 剪贴板粘贴后是否恢复原剪贴板内容（自动化场景默认不恢复，省去两次剪贴板读写）
+    preserve_clipboard: bool
+    # 项目根目录（用于默认工作目录）
+    project_root: Path
+
+
+def _compute_ws_url(backend_address: str, ws_url: str) -> str:
+    """拼接 WebSocket 地址：ws://<后端地址>/ws/ai-tool；显式配置了 ws_url 时直接使用。"""
+    if ws_url:
+        return ws_url
+    base = backend_address.strip()
     if base.startswith("http://"):
         base = base[7:]
     elif base.startswith("https://"):
@@ -42,3 +49,46 @@ def get_ws_url() -> str:
     if not base.startswith("ws://") and not base.startswith("wss://"):
         base = "ws://" + base
     return base.rstrip("/") + "/ws/ai-tool"
+
+
+@functools.cache
+def get_config() -> Config:
+    """读取并解析环境变量，进程内只做一次。"""
+    backend_address = os.getenv("CURSOR_BACKEND_ADDRESS", "43.139.194.139/aiProject")
+    ws_url = os.getenv("CURSOR_WS_URL", "")
+    return Config(
+        backend_address=backend_address,
+        ws_url=ws_url,
+        resolved_ws_url=_compute_ws_url(backend_address, ws_url),
+        cursor_exe=os.getenv("CURSOR_EXE", "cursor"),
+        reconnect_interval=float(os.getenv("RECONNECT_INTERVAL", "5")),
+        cursor_ui_timeout=int(os.getenv("CURSOR_UI_TIMEOUT", "15")),
+        # 若你的 Cursor 版本不同，可在 .env 中覆盖，如 CURSOR_SEND_HOTKEY=Ctrl+Enter
+        cursor_send_hotkey=os.getenv("CURSOR_SEND_HOTKEY", "Enter"),
+        cursor_open_agent_hotkey=os.getenv("CURSOR_OPEN_AGENT_HOTKEY", "Ctrl+Shift+L"),
+        preserve_clipboard=os.getenv("CURSOR_PRESERVE_CLIPBOARD", "").strip().lower() in ("1", "true", "yes", "on"),
+        project_root=Path(__file__).resolve().parent,
+    )
+
+
+# 兼容旧用法：模块级常量取自配置快照
+_cfg = get_config()
+BACKEND_ADDRESS = _cfg.backend_address
+WS_URL = _cfg.ws_url
+CURSOR_EXE = _cfg.cursor_exe
+RECONNECT_INTERVAL = _cfg.reconnect_interval
+CURSOR_UI_TIMEOUT = _cfg.cursor_ui_timeout
+CURSOR_SEND_HOTKEY = _cfg.cursor_send_hotkey
+CURSOR_OPEN_AGENT_HOTKEY = _cfg.cursor_open_agent_hotkey
+CURSOR_PRESERVE_CLIPBOARD = _cfg.preserve_clipboard
+PROJECT_ROOT = _cfg.project_root
+
+
+def get_ws_url() -> str:
+    """得到 WebSocket 地址：ws://<后端地址>/ws/ai-tool（不再带 projectId）。地址在读取配置时已拼接好。"""
+    return get_config().resolved_ws_url
+
+
+def reset_ws_url_cache() -> None:
+    """环境变量变化后调用，使 get_config / get_ws_url 重新读取（模块级常量仍为导入时的值）。"""
+    get_config.cache_clear()
@@ -4,12 +4,16 @@
 依赖：pywinauto (UIA)、pyautogui（备用）、config。
 """
 
+import ctypes
+import functools
 import json
 import logging
+import re
 import subprocess
 import sys
 import time
 from pathlib import Path
+from shutil import which
 from typing import Any, Optional
 
 import config
@@ -20,32 +24,151 @@ logger = logging.getLogger(__name__)
 _last_opened_folder_name: Optional[str] = None
 # projectId -> 该工程对应窗口的文件夹名（用于多窗口时按 projectId 定位）
 _project_windows: dict[str, str] = {}
+# Cursor/VS Code 类界面：编辑区多为 Edit 或 Document
+_INPUT_CONTROL_TYPES = ("Edit", "Document")
+# 控件类 -> 读取文本的方法（get_value 或 window_text），按类探测一次后缓存
+_text_getters: dict[type, Any] = {}
+# Cursor 窗口标题匹配（预编译；也直接传给 pywinauto 的 title_re，避免其每次调用重新编译）
+_CURSOR_TITLE_RE = re.compile(r".*Cursor.*")
+# 复用的 UIA Desktop 对象，避免每次查找窗口都重新构造
+_desktop = None
+# projectId（未传时为 ""）-> (窗口句柄, 窗口, 输入框控件或 None, 输入框的 IUIAutomationValuePattern 或 None)。
+# 按工程缓存已定位的窗口与输入框：后续命令先按句柄校验直接复用，失效时才重新枚举窗口、查找控件
+_window_cache: dict[str, tuple[int, Any, Any, Any]] = {}
+# projectId -> (上次校验标题的时间, 当时的 preferred_folder)。TTL 内且 preferred_folder 未变时只校验句柄，不再读标题
+_window_checked: dict[str, tuple[float, Optional[str]]] = {}
+_WINDOW_CACHE_TTL = 2.0
 
 
-def _resolve_cursor_exe() -> str:
-    """解析 Cursor 可执行文件路径，便于在 Windows 下从 PATH 或带 .exe 的名称正确找到。"""
-    exe = config.CURSOR_EXE.strip()
+def _resolve_cursor_exe(exe: Optional[str] = None) -> str:
+    """
+    解析 Cursor 可执行文件路径，便于在 Windows 下从 PATH 或带 .exe 的名称正确找到。
+    exe 为空时使用 config.CURSOR_EXE；结果按 exe 字符串缓存（见 _resolve_cursor_exe_cached），避免每次都扫描 PATH。
+    """
+    return _resolve_cursor_exe_cached(config.CURSOR_EXE if exe is None else exe)
+
+
+@functools.lru_cache(maxsize=2)
+def _resolve_cursor_exe_cached(exe: str) -> str:
+    """
+    _resolve_cursor_exe 的缓存实现，以 exe 字符串为键，配置变更后自然按新值重新解析。
+    启动时报 FileNotFoundError 会清空缓存，需要手动重新解析时调用 _resolve_cursor_exe_cached.cache_clear()。
+    """
+    exe = exe.strip()
     path = Path(exe)
     if path.is_absolute() and path.exists():
         return str(path)
     # 从 PATH 查找（当前进程环境）
-    found = __import__("shutil").which(exe)
+    found = which(exe)
     if found:
         return found
     if sys.platform == "win32":
         # Windows 下再尝试 Cursor.exe / cursor.exe
         for name in ("Cursor.exe", "cursor.exe"):
             if name != exe:
-                found = __import__("shutil").which(name)
+                found = which(name)
                 if found:
                     return found
     return exe
 
+# 启动 Cursor 时的平台相关参数。Windows 下与父进程控制台脱离、使用独立进程组。
+# 保持默认 close_fds=True：重定向标准句柄时只把这三个句柄传给子进程，避免长驻的 Cursor 继承其他句柄
+if sys.platform == "win32":
+    _POPEN_PLATFORM_KWARGS: dict[str, Any] = {
+        "creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP,
+    }
+else:
+    _POPEN_PLATFORM_KWARGS = {}
+
+# Windows：直接用 user32 枚举顶层窗口、读标题（纯 Win32，不经过 UIA）。
+# 使用独立的 WinDLL 实例声明 argtypes，避免影响 pywinauto 对 ctypes.windll.user32 的用法
+if sys.platform == "win32":
+    from ctypes import wintypes
+
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+    _WNDENUMPROC = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    _user32.EnumWindows.argtypes = [_WNDENUMPROC, wintypes.LPARAM]
+    _user32.EnumWindows.restype = wintypes.BOOL
+    _user32.IsWindow.argtypes = [wintypes.HWND]
+    _user32.IsWindow.restype = wintypes.BOOL
+    _user32.IsWindowVisible.argtypes = [wintypes.HWND]
+    _user32.IsWindowVisible.restype = wintypes.BOOL
+    _user32.GetWindowTextLengthW.argtypes = [wintypes.HWND]
+    _user32.GetWindowTextLengthW.restype = ctypes.c_int
+    _user32.GetWindowTextW.argtypes = [wintypes.HWND, wintypes.LPWSTR, ctypes.c_int]
+    _user32.GetWindowTextW.restype = ctypes.c_int
+
+    # SendInput：KEYEVENTF_UNICODE 直接注入字符，不经过剪贴板
+    _INPUT_KEYBOARD = 1
+    _KEYEVENTF_KEYUP = 0x0002
+    _KEYEVENTF_UNICODE = 0x0004
+    _VK_CONTROL = 0x11
+    _VK_A = 0x41
+
+    class _MOUSEINPUT(ctypes.Structure):
+        _fields_ = [
+            ("dx", wintypes.LONG),
+            ("dy", wintypes.LONG),
+            ("mouseData", wintypes.DWORD),
+            ("dwFlags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.c_size_t),
+        ]
+
+    class _KEYBDINPUT(ctypes.Structure):
+        _fields_ = [
+            ("wVk", wintypes.WORD),
+            ("wScan", wintypes.WORD),
+            ("dwFlags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.c_size_t),
+        ]
+
+    class _INPUTUNION(ctypes.Union):
+        # 含 MOUSEINPUT 以保证联合体大小与系统 INPUT 结构一致
+        _fields_ = [("mi", _MOUSEINPUT), ("ki", _KEYBDINPUT)]
+
+    class _INPUT(ctypes.Structure):
+        _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+    _user32.SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(_INPUT), ctypes.c_int]
+    _user32.SendInput.restype = wintypes.UINT
+
+    # 剪贴板：直接 OpenClipboard/SetClipboardData(CF_UNICODETEXT)，不经过 pyperclip
+    _CF_UNICODETEXT = 13
+    _GMEM_MOVEABLE = 0x0002
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
+    _kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+    _kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+    _kernel32.GlobalLock.restype = wintypes.LPVOID
+    _kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+    _kernel32.GlobalUnlock.restype = wintypes.BOOL
+    _kernel32.GlobalFree.argtypes = [wintypes.HGLOBAL]
+    _kernel32.GlobalFree.restype = wintypes.HGLOBAL
+    _user32.OpenClipboard.argtypes = [wintypes.HWND]
+    _user32.OpenClipboard.restype = wintypes.BOOL
+    _user32.EmptyClipboard.argtypes = []
+    _user32.EmptyClipboard.restype = wintypes.BOOL
+    _user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+    _user32.SetClipboardData.restype = wintypes.HANDLE
+    _user32.CloseClipboard.argtypes = []
+    _user32.CloseClipboard.restype = wintypes.BOOL
+    # OpenClipboard(NULL) 后 EmptyClipboard 会把所有者置空，SetClipboardData 随之失败，需先建一个仅消息窗口作为所有者
+    _HWND_MESSAGE = wintypes.HWND(-3)
+    _user32.CreateWindowExW.argtypes = [
+        wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD, ctypes.c_int, ctypes.c_int,
+        ctypes.c_int, ctypes.c_int, wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID,
+    ]
+    _user32.CreateWindowExW.restype = wintypes.HWND
+    _user32.DestroyWindow.argtypes = [wintypes.HWND]
+    _user32.DestroyWindow.restype = wintypes.BOOL
+
 # 可选依赖：UI 自动化失败时不影响其他命令
 _pywinauto_ok = False
 _pyautogui_ok = False
 try:
-    from pywinauto import Application
+    from pywinauto import Application, Desktop
     from pywinauto.findwindows import ElementNotFoundError
     _pywinauto_ok = True
 except ImportError:
@@ -61,6 +184,35 @@ try:
     _pyperclip_ok = True
 except ImportError:
     pass
+# Windows 下直接调用 Win32 剪贴板接口，不依赖 pyperclip
+_clipboard_ok = _pyperclip_ok or sys.platform == "win32"
+# SendInput 单次注入的最大字符数，更长的文本走剪贴板
+_SENDINPUT_MAX_CHARS = 2000
+# 可选：直接调用 UIA COM 接口（TreeWalker 惰性遍历、CacheRequest 批量取属性）。
+# 依赖 pywinauto 内部模块，不可用时回退到 descendants
+_uia_com_ok = False
+try:
+    from pywinauto.controls.uiawrapper import UIAWrapper
+    from pywinauto.uia_defines import IUIA, get_elem_interface
+    from pywinauto.uia_element_info import UIAElementInfo
+    _uia_com_ok = True
+except ImportError:
+    pass
+
+
+def init_uia_thread() -> None:
+    """
+    UIA 工作线程初始化，供线程池 initializer 使用。
+    按 sys.coinit_flags 初始化 COM：pywinauto 导入时将其设为 0（COINIT_MULTITHREADED），并在主线程创建 IUIA 单例，
+    工作线程须同在 MTA 中才能直接使用这些接口指针（STA 线程无消息泵，跨套间调用会出问题）。
+    """
+    if not _pywinauto_ok:
+        return
+    try:
+        import comtypes
+        comtypes.CoInitializeEx(getattr(sys, "coinit_flags", 0))
+    except Exception as e:
+        logger.debug("初始化 UIA 线程 COM 失败: %s", e)
 
 
 def create_folder(
@@ -97,6 +249,7 @@ def create_folder(
 def open_cursor(folder_path: str, project_id: Optional[str] = None) -> dict[str, Any]:
     """用 Cursor 打开指定文件夹。若传 project_id 则登记到 projectId->窗口 映射表，便于后续按 projectId 操作对应窗口。"""
     global _last_opened_folder_name, _project_windows
+    cursor_exe = config.CURSOR_EXE
     try:
         p = Path(folder_path)
         if not p.is_absolute():
@@ -118,53 +271,161 @@ def open_cursor(folder_path: str, project_id: Optional[str] = None) -> dict[str,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             cwd=config.PROJECT_ROOT,
+            **_POPEN_PLATFORM_KWARGS,
         )
         return {"ok": True, "path": path_str}
     except FileNotFoundError:
-        return {"ok": False, "error": f"未找到 Cursor: {_resolve_cursor_exe()}（请设置 .env 中 CURSOR_EXE 为完整路径，如 D:\\program\\cursor\\Cursor.exe）"}
+        # 缓存的路径可能已失效（如 Cursor 被卸载/移动），清空后下次启动时重新解析；此处不再解析，以免立即把失败结果缓存回去
+        _resolve_cursor_exe_cached.cache_clear()
+        return {"ok": False, "error": f"未找到 Cursor: {cursor_exe}（请设置 .env 中 CURSOR_EXE 为完整路径，如 D:\\program\\cursor\\Cursor.exe）"}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
 
+def _get_desktop():
+    """返回复用的 UIA Desktop 对象。"""
+    global _desktop
+    if _desktop is None:
+        _desktop = Desktop(backend="uia")
+    return _desktop
+
+
+def _drop_cached_window(key: str) -> None:
+    """清除某 projectId 的窗口缓存。"""
+    _window_cache.pop(key, None)
+    _window_checked.pop(key, None)
+
+
+def _get_cached_window(project_id: Optional[str], preferred_folder: Optional[str]):
+    """
+    返回该 projectId 缓存的 Cursor 窗口；窗口已关闭、标题不再含 Cursor 或不含 preferred_folder 时丢弃缓存并返回 None。
+    距上次校验标题不足 _WINDOW_CACHE_TTL 秒且 preferred_folder 未变时只校验句柄。
+    包装对象失效但句柄仍有效时，按句柄重新附着 UIA，无需重新枚举桌面窗口。
+    """
+    key = project_id or ""
+    entry = _window_cache.get(key)
+    if entry is None:
+        return None
+    hwnd, wnd = entry[0], entry[1]
+    if sys.platform == "win32" and not _user32.IsWindow(hwnd):
+        _drop_cached_window(key)
+        return None
+    now = time.monotonic()
+    checked = _window_checked.get(key)
+    if checked is not None and checked[1] == preferred_folder and now - checked[0] < _WINDOW_CACHE_TTL:
+        return wnd
+    try:
+        title = wnd.window_text() or ""
+    except Exception:
+        try:
+            wnd = _get_desktop().window(handle=hwnd).wrapper_object()
+            title = wnd.window_text() or ""
+        except Exception:
+            _drop_cached_window(key)
+            return None
+        _window_cache[key] = (hwnd, wnd, None, None)
+    if not _CURSOR_TITLE_RE.match(title) or (preferred_folder and preferred_folder not in title):
+        _drop_cached_window(key)
+        return None
+    _window_checked[key] = (now, preferred_folder)
+    return wnd
+
+
 def _find_cursor_window(project_id: Optional[str] = None):
     """查找 Cursor 主窗口（UIA）。project_id 为空则用“上次打开的文件夹名”；否则用 projectId 映射表中的文件夹名优先匹配对应窗口。"""
     if not _pywinauto_ok:
         logger.warning("pywinauto 未安装，无法查找 Cursor 窗口")
         return None
-    try:
-        from pywinauto import Application
-        from pywinauto import Desktop
-    except Exception as e:
-        logger.error("导入 pywinauto 失败: %s", e)
-        return None
-
     preferred_folder = (_project_windows.get(project_id) if project_id else None) or _last_opened_folder_name
+    wnd = _get_cached_window(project_id, preferred_folder)
+    if wnd is not None:
+        return wnd
+    wnd = _locate_cursor_window(project_id, preferred_folder)
+    if wnd is not None:
+        key = project_id or ""
+        try:
+            _window_cache[key] = (wnd.handle, wnd, None, None)
+            # 回退到的“第一个 Cursor 窗口”标题不含 preferred_folder 时不记 TTL，
+            # 下次仍校验标题（如新开的工程窗口尚在启动），对应窗口出现后即可切换过去
+            if not preferred_folder or preferred_folder in (wnd.window_text() or ""):
+                _window_checked[key] = (time.monotonic(), preferred_folder)
+        except Exception:
+            pass
+    return wnd
+
+
+def _enum_cursor_hwnds(preferred_folder: Optional[str] = None) -> list[tuple[int, str]]:
+    """
+    用 Win32 EnumWindows 枚举可见顶层窗口，返回标题匹配 Cursor 的 (句柄, 标题)，标题含 preferred_folder 的排在前面。
+    仅 Windows 可用；只读窗口标题，不创建 UIA 包装、不走 UIA 跨进程调用。
+    """
+    preferred: list[tuple[int, str]] = []
+    others: list[tuple[int, str]] = []
+
+    def callback(hwnd, _lparam):
+        if not _user32.IsWindowVisible(hwnd):
+            return True
+        length = _user32.GetWindowTextLengthW(hwnd)
+        if length <= 0:
+            return True
+        buf = ctypes.create_unicode_buffer(length + 1)
+        _user32.GetWindowTextW(hwnd, buf, length + 1)
+        title = buf.value
+        if _CURSOR_TITLE_RE.match(title):
+            if preferred_folder and preferred_folder in title:
+                preferred.append((hwnd, title))
+            else:
+                others.append((hwnd, title))
+        return True
+
+    _user32.EnumWindows(_WNDENUMPROC(callback), 0)
+    return preferred + others
+
+
+def _locate_cursor_window(project_id: Optional[str], preferred_folder: Optional[str]):
+    """实际枚举/连接查找 Cursor 窗口，由 _find_cursor_window 在缓存失效时调用。"""
+    # 1) Windows：Win32 枚举窗口标题筛出 Cursor 窗口，只对选中的句柄附着 UIA
+    if sys.platform == "win32":
+        try:
+            hwnds = _enum_cursor_hwnds(preferred_folder)
+            if hwnds:
+                hwnd, title = hwnds[0]
+                wnd = _get_desktop().window(handle=hwnd).wrapper_object()
+                if preferred_folder and preferred_folder in title:
+                    logger.info("按标题匹配到窗口(project_id=%s): %s", project_id, title[:80])
+                else:
+                    logger.info("使用第一个 Cursor 窗口: %s", title[:80])
+                return wnd
+        except Exception as e:
+            logger.debug("Win32 枚举 Cursor 窗口失败: %s", e)
 
-    # 1) 枚举标题含 Cursor 的顶层窗口，若有 preferred_folder 则优先选标题含该名的
+    # 2) UIA 枚举顶层窗口（仅一次），用预编译正则筛出标题含 Cursor 的，若有 preferred_folder 则优先选标题含该名的
     try:
-        desktop = Desktop(backend="uia")
-        cursor_windows = desktop.windows(title_re=".*Cursor.*")
-        if cursor_windows and preferred_folder:
-            for wnd in cursor_windows:
-                try:
-                    title = wnd.window_text() or ""
-                    if preferred_folder in title:
-                        logger.info("按标题匹配到窗口(project_id=%s): %s", project_id, title[:80])
-                        return wnd
-                except Exception:
-                    continue
+        cursor_windows = []
+        for wnd in _get_desktop().windows():
+            try:
+                title = wnd.window_text() or ""
+            except Exception:
+                continue
+            if not _CURSOR_TITLE_RE.match(title):
+                continue
+            if preferred_folder and preferred_folder in title:
+                logger.info("按标题匹配到窗口(project_id=%s): %s", project_id, title[:80])
+                return wnd
+            cursor_windows.append((wnd, title))
         if cursor_windows:
-            logger.info("使用第一个 Cursor 窗口: %s", (cursor_windows[0].window_text() or "")[:80])
-            return cursor_windows[0]
+            wnd, title = cursor_windows[0]
+            logger.info("使用第一个 Cursor 窗口: %s", title[:80])
+            return wnd
     except Exception as e:
         logger.debug("枚举 Cursor 窗口失败: %s", e)
 
-    # 2) connect 按标题匹配（任意一个 Cursor 窗口）
+    # 3) connect 按标题匹配（任意一个 Cursor 窗口）
     try:
         logger.info("尝试按标题 .*Cursor.* 连接 Cursor 进程")
-        app = Application(backend="uia").connect(title_re=".*Cursor.*", timeout=config.CURSOR_UI_TIMEOUT)
+        app = Application(backend="uia").connect(title_re=_CURSOR_TITLE_RE, timeout=config.CURSOR_UI_TIMEOUT)
         try:
-            wnd = app.window(title_re=".*Cursor.*")
+            wnd = app.window(title_re=_CURSOR_TITLE_RE)
             if preferred_folder and wnd.window_text() and preferred_folder not in wnd.window_text():
                 logger.info("当前连接到的 Cursor 窗口标题: %s", (wnd.window_text() or "")[:80])
             return wnd
@@ -173,7 +434,7 @@ def _find_cursor_window(project_id: Optional[str] = None):
     except Exception as e:
         logger.warning("按标题 .*Cursor.* 查找 Cursor 失败: %s", e)
 
-    # 3) 按可执行文件完整路径连接（path 为精确路径，非正则）
+    # 4) 按可执行文件完整路径连接（path 为精确路径，非正则）
     try:
         exe_path = _resolve_cursor_exe()
         if exe_path and Path(exe_path).exists():
@@ -185,6 +446,154 @@ def _find_cursor_window(project_id: Optional[str] = None):
     return None
 
 
+def _get_cached_input_ctrl(project_id: Optional[str], wnd):
+    """返回该 projectId 缓存的输入框控件；窗口已变或控件失效（访问 element_info 抛异常）时返回 None。"""
+    entry = _window_cache.get(project_id or "")
+    if entry is None or entry[2] is None:
+        return None
+    hwnd, ctrl = entry[0], entry[2]
+    try:
+        if wnd.handle != hwnd:
+            return None
+        ctrl.element_info.control_type
+        return ctrl
+    except Exception:
+        return None
+
+
+def _get_value_pattern(ctrl):
+    """取控件底层 IUIAutomationElement 的 ValuePattern COM 接口；不支持时返回 None。"""
+    if not _uia_com_ok:
+        return None
+    try:
+        return get_elem_interface(ctrl.element_info.element, "Value")
+    except Exception:
+        return None
+
+
+def _remember_input_ctrl(project_id: Optional[str], wnd, ctrl) -> None:
+    """记录本次成功使用的输入框控件（及其 ValuePattern），供该 projectId 的后续命令直接复用。"""
+    key = project_id or ""
+    entry = _window_cache.get(key)
+    if entry is not None and entry[2] is ctrl:
+        value_pattern = entry[3]
+    else:
+        value_pattern = _get_value_pattern(ctrl)
+    try:
+        _window_cache[key] = (wnd.handle, wnd, ctrl, value_pattern)
+    except Exception:
+        pass
+
+
+def _cached_value_pattern(project_id: Optional[str], ctrl):
+    """返回缓存中该输入框控件的 ValuePattern；控件不是缓存的那个时返回 None。"""
+    entry = _window_cache.get(project_id or "")
+    if entry is None or entry[2] is not ctrl:
+        return None
+    return entry[3]
+
+
+def _forget_input_ctrl(project_id: Optional[str], ctrl) -> None:
+    """缓存的输入框控件操作失败（如 UIA ElementNotAvailable）时丢弃，下次重新查找。"""
+    key = project_id or ""
+    entry = _window_cache.get(key)
+    if entry is not None and entry[2] is ctrl:
+        _window_cache[key] = (entry[0], entry[1], None, None)
+
+
+def _get_control_text(ctrl) -> str:
+    """
+    读取控件文本：有 get_value（ValuePattern）则用之，否则用 window_text。
+    在控件类上查找方法并按类缓存，避免对每个控件实例做 hasattr（会走 pywinauto 包装器的 __getattr__）。
+    """
+    cls = type(ctrl)
+    getter = _text_getters.get(cls)
+    if getter is None:
+        getter = getattr(cls, "get_value", None) or cls.window_text
+        _text_getters[cls] = getter
+    return getter(ctrl) or ""
+
+
+def _walk_for_control(wnd, want_types, max_depth: int = 32, max_visited: int = 1000):
+    """
+    用 UIA ControlViewWalker 先序惰性遍历 wnd 的子树，逐个给出控件类型属于 want_types 的控件（pywinauto wrapper）。
+    不像 descendants() 那样先取回整棵树，调用方找到目标即可停止；控件类型用 CurrentControlType 整数比较。
+    最多深入 max_depth 层、访问 max_visited 个节点；因上述限制未遍历完整棵子树时生成器返回 True，否则返回 False。
+    """
+    iuia = IUIA()
+    walker = iuia.iuia.ControlViewWalker
+    want_ids = {iuia.known_control_types[t] for t in want_types}
+    stack = [(walker.GetFirstChildElement(wnd.element_info.element), 1)]
+    visited = 0
+    truncated = False
+    while stack:
+        element, depth = stack.pop()
+        if not element:
+            continue
+        visited += 1
+        if visited > max_visited:
+            return True
+        # 先压兄弟、后压子节点，出栈即为先序
+        stack.append((walker.GetNextSiblingElement(element), depth))
+        child = walker.GetFirstChildElement(element)
+        if depth < max_depth:
+            stack.append((child, depth + 1))
+        elif child:
+            truncated = True
+        if element.CurrentControlType in want_ids:
+            yield UIAWrapper(UIAElementInfo(element))
+    return truncated
+
+
+def _iter_controls(wnd, want_types):
+    """
+    依次给出 wnd 内类型属于 want_types 的控件：先用 TreeWalker 惰性遍历（找到即可停止）。
+    仅当遍历出错，或因 max_visited/max_depth 未遍历完整棵子树时，才回退到 descendants(control_type=...)
+    （由 UIA 服务端按条件过滤）；完整遍历过则不再重复查找，避免已尝试过的控件被再次给出。
+    """
+    if _uia_com_ok:
+        try:
+            if not (yield from _walk_for_control(wnd, want_types)):
+                return
+            logger.debug("TreeWalker 未遍历完整棵子树，改用 descendants 补充查找")
+        except Exception as e:
+            logger.debug("TreeWalker 遍历失败，改用 descendants: %s", e)
+    for ctrl_type in want_types:
+        yield from wnd.descendants(control_type=ctrl_type)
+
+
+def _input_candidates(wnd, project_id: Optional[str] = None):
+    """依次给出输入框候选控件：先是缓存的控件，再在窗口内查找 Edit/Document。"""
+    cached = _get_cached_input_ctrl(project_id, wnd)
+    if cached is not None:
+        yield cached
+    yield from _iter_controls(wnd, _INPUT_CONTROL_TYPES)
+
+
+def _wait_until(predicate, timeout: float, interval: float = 0.005) -> bool:
+    """轮询 predicate 直到返回真或超时，返回是否满足；predicate 抛异常视为未满足。用于替代固定时长的 sleep。"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if predicate():
+                return True
+        except Exception:
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+# 热键字符串中的修饰键名 -> pyautogui 键名
+_KEY_MAP = {
+    "ctrl": "ctrl", "control": "ctrl",
+    "alt": "alt",
+    "shift": "shift",
+    "win": "win", "windows": "win", "meta": "win", "cmd": "command",
+    "command": "command",
+}
+
+
 def _parse_hotkey(hotkey_str: str) -> list[str]:
     """将配置中的热键字符串（如 'Ctrl+L'、'Ctrl+Shift+I'）解析为 pyautogui.hotkey 的参数列表。"""
     if not hotkey_str or not hotkey_str.strip():
@@ -192,19 +601,12 @@ def _parse_hotkey(hotkey_str: str) -> list[str]:
     parts = [p.strip() for p in hotkey_str.split("+") if p.strip()]
     if not parts:
         return []
-    key_map = {
-        "ctrl": "ctrl", "control": "ctrl",
-        "alt": "alt",
-        "shift": "shift",
-        "win": "win", "windows": "win", "meta": "win", "cmd": "command",
-        "command": "command",
-    }
     modifiers = []
     main_key = None
     for p in parts:
         lower = p.lower()
-        if lower in key_map:
-            mod = key_map[lower]
+        if lower in _KEY_MAP:
+            mod = _KEY_MAP[lower]
             if mod != "command" or sys.platform != "win32":
                 modifiers.append(mod if mod != "command" else "ctrl")
             else:
@@ -219,6 +621,11 @@ def _parse_hotkey(hotkey_str: str) -> list[str]:
     return [*modifiers, main_key]
 
 
+# 配置中的热键进程内不变，导入时解析一次
+_SEND_KEYS = _parse_hotkey(config.CURSOR_SEND_HOTKEY)
+_AGENT_KEYS = _parse_hotkey(config.CURSOR_OPEN_AGENT_HOTKEY)
+
+
 def open_new_agent(project_id: Optional[str] = None) -> dict[str, Any]:
     """
     打开新的 Agent（Chat/Composer）：先聚焦对应 projectId 的 Cursor 窗口，再发送配置的热键。
@@ -226,7 +633,7 @@ def open_new_agent(project_id: Optional[str] = None) -> dict[str, Any]:
     """
     if not _pyautogui_ok:
         return {"ok": False, "error": "需要 pyautogui 才能发送热键"}
-    keys = _parse_hotkey(config.CURSOR_OPEN_AGENT_HOTKEY)
+    keys = _AGENT_KEYS
     if not keys:
         return {"ok": False, "error": f"无效的热键配置: {config.CURSOR_OPEN_AGENT_HOTKEY}"}
     try:
@@ -234,7 +641,7 @@ def open_new_agent(project_id: Optional[str] = None) -> dict[str, Any]:
             wnd = _find_cursor_window(project_id)
             if wnd:
                 wnd.set_focus()
-                time.sleep(0.2)
+                _wait_until(lambda: wnd.is_active(), 0.2)
         pyautogui.hotkey(*keys)
         return {"ok": True, "hotkey": config.CURSOR_OPEN_AGENT_HOTKEY}
     except Exception as e:
@@ -260,44 +667,44 @@ def get_input_state(project_id: Optional[str] = None) -> dict[str, Any]:
         try:
             # 尝试多种可能控件类型
             logger.debug("get_input_state: 已找到 Cursor 窗口，开始遍历子控件查找 Edit/Document")
-            for ctrl in wnd.descendants():
+            for ctrl in _input_candidates(wnd, project_id):
                 try:
-                    ctrl_type = ctrl.element_info.control_type
-                    if ctrl_type in ("Edit", "Document"):
-                        text = ctrl.get_value() if hasattr(ctrl, "get_value") else (ctrl.window_text() or "")
-                        if text is None:
-                            text = ""
-                        out["ok"] = True
-                        out["text"] = text
-                        out["method"] = "uia"
-                        logger.info("get_input_state: 找到输入框控件，当前内容长度=%s", len(text))
-                        return out
+                    text = _get_control_text(ctrl)
+                    _remember_input_ctrl(project_id, wnd, ctrl)
+                    out["ok"] = True
+                    out["text"] = text
+                    out["method"] = "uia"
+                    logger.info("get_input_state: 找到输入框控件，当前内容长度=%s", len(text))
+                    return out
                 except Exception:
+                    _forget_input_ctrl(project_id, ctrl)
                     continue
         except ElementNotFoundError:
             pass
-        # 调试：输出前若干个子控件的信息，方便分析 Cursor 输入框的真实控件类型
-        try:
-            logger.warning("get_input_state: 在 Cursor 窗口中未找到 Edit/Document 类型的输入框控件，开始输出部分子控件信息以便调试")
-            for idx, ctrl in enumerate(wnd.descendants()):
-                if idx >= 40:  # 避免日志过长，先看前 40 个
-                    break
-                try:
-                    info = ctrl.element_info
-                    logger.info(
-                        "ctrl[%d]: type=%s, name=%r, auto_id=%r, class_name=%r, rect=%s",
-                        idx,
-                        getattr(info, "control_type", None),
-                        getattr(info, "name", None),
-                        getattr(info, "automation_id", None),
-                        getattr(info, "class_name", None),
-                        getattr(info, "rectangle", None),
-                    )
-                except Exception as e:
-                    logger.debug("dump ctrl[%d] 失败: %s", idx, e)
-        except Exception as e:
-            logger.debug("遍历并输出子控件信息失败: %s", e)
-        logger.warning("get_input_state: 在 Cursor 窗口中未找到 Edit/Document 类型的输入框控件（请查看上方 ctrl[...] 日志以便后续精确匹配）")
+        # 调试：输出前若干个子控件的信息，方便分析 Cursor 输入框的真实控件类型。
+        # 需遍历子控件并逐个读取 UIA 属性，仅在开启 DEBUG 日志时执行
+        if logger.isEnabledFor(logging.DEBUG):
+            try:
+                logger.debug("get_input_state: 开始输出部分子控件信息以便调试")
+                for idx, ctrl in enumerate(wnd.descendants()):
+                    if idx >= 40:  # 避免日志过长，先看前 40 个
+                        break
+                    try:
+                        ei = ctrl.element_info
+                        logger.debug(
+                            "ctrl[%d]: type=%s, name=%r, auto_id=%r, class_name=%r, rect=%s",
+                            idx,
+                            ei.control_type,
+                            ei.name,
+                            ei.automation_id,
+                            ei.class_name,
+                            ei.rectangle,
+                        )
+                    except Exception as e:
+                        logger.debug("dump ctrl[%d] 失败: %s", idx, e)
+            except Exception as e:
+                logger.debug("遍历并输出子控件信息失败: %s", e)
+        logger.warning("get_input_state: 在 Cursor 窗口中未找到 Edit/Document 类型的输入框控件（开启 DEBUG 日志可查看 ctrl[...] 子控件信息以便后续精确匹配）")
         out["error"] = "未在 Cursor 窗口中找到输入框控件（UIA）"
         return out
     except Exception as e:
@@ -305,47 +712,221 @@ def get_input_state(project_id: Optional[str] = None) -> dict[str, Any]:
         return out
 
 
-def _paste_text_via_clipboard(text: str) -> bool:
-    """用剪贴板粘贴文本（支持中文等 Unicode），粘贴后恢复原剪贴板。"""
-    if not _pyperclip_ok:
+def _normalize_text(text: str) -> str:
+    """统一换行并去掉首尾空白，用于比较写入前后的文本。"""
+    return text.replace("\r\n", "\n").strip()
+
+
+def _set_value_verified(ctrl, text: str, value_pattern=None) -> bool:
+    """
+    用 UIA ValuePattern（IUIAutomationValuePattern）的 SetValue 整体替换输入框内容，并读回 CurrentValue 校验是否生效。
+    value_pattern 为缓存的接口时直接使用，否则从控件现取。
+    控件不支持 ValuePattern、COM 调用出错或读回不一致时返回 False；读回不一致时会先清空，避免后续写入与残留内容叠加。
+    """
+    if value_pattern is None:
+        value_pattern = _get_value_pattern(ctrl)
+        if value_pattern is None:
+            return False
+    try:
+        value_pattern.SetValue(text)
+    except Exception as e:
+        logger.debug("ValuePattern.SetValue 写入失败: %s", e)
+        return False
+    try:
+        if _normalize_text(value_pattern.CurrentValue or "") == _normalize_text(text):
+            return True
+        logger.debug("ValuePattern.SetValue 未生效（读回内容不一致），改用其他方式写入")
+        value_pattern.SetValue("")
+    except Exception as e:
+        logger.debug("ValuePattern 校验失败: %s", e)
+    return False
+
+
+def _send_unicode_string(text: str, select_all: bool = False) -> bool:
+    """
+    Windows：用一次 SendInput 以 KEYEVENTF_UNICODE 把整段文本注入当前焦点控件，不经过剪贴板、无逐字延时。
+    按 UTF-16 码元注入（非 BMP 字符自然拆成代理对）。含换行的文本不走此路径（换行会被当作 Enter 直接发送），返回 False。
+    select_all 为 True 时在同一批输入前先按 Ctrl+A，使注入的文本替换输入框原有内容，而不是追加在光标处。
+    """
+    if sys.platform != "win32" or "\n" in text or "\r" in text:
+        return False
+    data = text.encode("utf-16-le")
+    units = [int.from_bytes(data[i:i + 2], "little") for i in range(0, len(data), 2)]
+    keys = []
+    if select_all:
+        keys += [(_VK_CONTROL, 0, 0), (_VK_A, 0, 0), (_VK_A, 0, _KEYEVENTF_KEYUP), (_VK_CONTROL, 0, _KEYEVENTF_KEYUP)]
+    for unit in units:
+        keys += [(0, unit, _KEYEVENTF_UNICODE), (0, unit, _KEYEVENTF_UNICODE | _KEYEVENTF_KEYUP)]
+    inputs = (_INPUT * len(keys))()
+    for item, (vk, scan, flags) in zip(inputs, keys):
+        item.type = _INPUT_KEYBOARD
+        item.u.ki.wVk = vk
+        item.u.ki.wScan = scan
+        item.u.ki.dwFlags = flags
+    sent = _user32.SendInput(len(inputs), inputs, ctypes.sizeof(_INPUT))
+    return sent == len(inputs)
+
+
+def _set_clipboard_text(text: str) -> bool:
+    """
+    Windows：直接用 Win32 接口把文本以 CF_UNICODETEXT 写入剪贴板，返回是否成功。
+    剪贴板所有者为本次临时创建的仅消息窗口，写入后即销毁（本线程不泵消息，不能让它长期持有剪贴板）。
+    """
+    data = text.encode("utf-16-le") + b"\x00\x00"
+    hwnd = _user32.CreateWindowExW(0, "STATIC", None, 0, 0, 0, 0, 0, _HWND_MESSAGE, None, None, None)
+    if not hwnd:
+        return False
+    try:
+        return _write_clipboard(hwnd, data)
+    finally:
+        _user32.DestroyWindow(hwnd)
+
+
+def _write_clipboard(hwnd, data: bytes) -> bool:
+    """以 hwnd 为所有者打开剪贴板，写入 UTF-16 编码（含结尾 NUL）的 data。"""
+    # 剪贴板可能被其他进程短暂占用，稍作重试
+    if not _wait_until(lambda: _user32.OpenClipboard(hwnd), 0.2):
         return False
     try:
-        old = pyperclip.paste()
+        _user32.EmptyClipboard()
+        handle = _kernel32.GlobalAlloc(_GMEM_MOVEABLE, len(data))
+        if not handle:
+            return False
+        ptr = _kernel32.GlobalLock(handle)
+        if not ptr:
+            _kernel32.GlobalFree(handle)
+            return False
+        ctypes.memmove(ptr, data, len(data))
+        _kernel32.GlobalUnlock(handle)
+        if not _user32.SetClipboardData(_CF_UNICODETEXT, handle):
+            _kernel32.GlobalFree(handle)
+            return False
+        # SetClipboardData 成功后内存归系统所有，不能再释放
+        return True
+    finally:
+        _user32.CloseClipboard()
+
+
+def _copy_to_clipboard(text: str) -> bool:
+    """把文本写入剪贴板：Windows 下直接调用 Win32 接口，否则用 pyperclip。"""
+    if sys.platform == "win32" and _set_clipboard_text(text):
+        return True
+    if _pyperclip_ok:
         pyperclip.copy(text)
-        time.sleep(0.05)
+        _wait_until(lambda: pyperclip.paste() == text, 0.2)
+        return True
+    return False
+
+
+def _paste_text_via_clipboard(text: str) -> bool:
+    """用剪贴板粘贴文本（支持中文等 Unicode）。配置 CURSOR_PRESERVE_CLIPBOARD 时粘贴后恢复原剪贴板（读取原内容需 pyperclip）。"""
+    if not _clipboard_ok:
+        return False
+    try:
+        old = pyperclip.paste() if config.CURSOR_PRESERVE_CLIPBOARD and _pyperclip_ok else None
+        if not _copy_to_clipboard(text):
+            return False
         pyautogui.hotkey("ctrl", "v")
-        time.sleep(0.05)
-        pyperclip.copy(old)
+        if old is not None:
+            # 粘贴由目标窗口异步读取剪贴板，无可观察的完成信号，恢复前仍需短暂等待
+            time.sleep(0.05)
+            _copy_to_clipboard(old)
         return True
     except Exception as e:
         logger.debug("剪贴板粘贴失败: %s", e)
         return False
 
 
-def _dump_send_candidates(wnd) -> None:
-    """调试用：把窗口中所有可点击的 Button/Hyperlink/Image 的 name、automation_id 打到日志，便于在 Cursor 里找到发送按钮。"""
+# 发送按钮匹配：name/automation_id（小写）包含 keywords 之一且不含 exclude 中任一项
+_SEND_BUTTON_KEYWORDS = ("send", "submit", "提交", "发送", "arrow", "composer", "chat")
+_SEND_BUTTON_EXCLUDE = ("new", "create", "newchat", "新对话", "clear", "stop", "cancel")
+# Cursor 发送按钮可能是 Button，也可能是 Hyperlink/Image（图标按钮）
+_SEND_BUTTON_TYPES = ("Button", "Hyperlink", "Image")
+
+
+def _looks_like_send_button(name: str, auto_id: str) -> bool:
+    """按 name/automation_id 判断控件是否像“发送”按钮。"""
+    combined = (name + " " + auto_id).lower()
+    for n in _SEND_BUTTON_EXCLUDE:
+        if n in combined:
+            return False
+    for kw in _SEND_BUTTON_KEYWORDS:
+        if kw in combined:
+            return True
+    return False
+
+
+def _find_all_cached(wnd, want_types) -> list[tuple[Any, Optional[str], str, str, Any]]:
+    """
+    用一次 UIA FindAllBuildCache 取回 wnd 下类型属于 want_types 的全部控件，
+    并通过 CacheRequest 一并取回 control_type、name、automation_id、矩形，之后读取这些属性不再跨进程。
+    返回 [(IUIAutomationElement, control_type, name, automation_id, (left, top, right, bottom))]。
+    """
+    iuia = IUIA()
+    uia = iuia.iuia
+    dll = iuia.UIA_dll
+    cache = uia.CreateCacheRequest()
+    for prop_id in (
+        dll.UIA_ControlTypePropertyId,
+        dll.UIA_NamePropertyId,
+        dll.UIA_AutomationIdPropertyId,
+        dll.UIA_BoundingRectanglePropertyId,
+    ):
+        cache.AddProperty(prop_id)
+    condition = None
+    for t in want_types:
+        cond = uia.CreatePropertyCondition(dll.UIA_ControlTypePropertyId, iuia.known_control_types[t])
+        condition = cond if condition is None else uia.CreateOrCondition(condition, cond)
+    found = wnd.element_info.element.FindAllBuildCache(iuia.tree_scope["descendants"], condition, cache)
+    out = []
+    for i in range(found.Length):
+        element = found.GetElement(i)
+        r = element.CachedBoundingRectangle
+        out.append((
+            element,
+            iuia.known_control_type_ids.get(element.CachedControlType),
+            element.CachedName or "",
+            element.CachedAutomationId or "",
+            (r.left, r.top, r.right, r.bottom),
+        ))
+    return out
+
+
+def _dump_send_candidates(wnd, cached: Optional[list] = None) -> None:
+    """
+    调试用：把窗口中所有可点击的 Button/Hyperlink/Image 的 name、automation_id 打到日志，便于在 Cursor 里找到发送按钮。
+    cached 为 _find_all_cached 的结果时直接使用其中已缓存的属性，不再访问 UIA。
+    """
     if not _pywinauto_ok:
         return
-    want_types = ("Button", "Hyperlink", "Image")
+    want_types = _SEND_BUTTON_TYPES
+    limit = 30
     try:
-        candidates = []
-        for ctrl in wnd.descendants():
-            try:
-                ct = getattr(ctrl.element_info, "control_type", None)
-                if ct not in want_types:
+        if cached is not None:
+            total = len(cached)
+            candidates = [(ct, name, auto_id, rect) for _, ct, name, auto_id, rect in cached[:limit]]
+        else:
+            # 只保留前 limit 个候选的详细信息，其余仅计数，不再读取 name/automation_id/rect
+            candidates = []
+            total = 0
+            for ctrl in wnd.descendants():
+                try:
+                    ei = ctrl.element_info
+                    ct = ei.control_type
+                    if ct not in want_types:
+                        continue
+                    total += 1
+                    if len(candidates) >= limit:
+                        continue
+                    candidates.append((ct, ei.name or "", ei.automation_id or "", ei.rectangle))
+                except Exception:
                     continue
-                name = (getattr(ctrl.element_info, "name", None) or "") or ""
-                auto_id = (getattr(ctrl.element_info, "automation_id", None) or "") or ""
-                rect = getattr(ctrl.element_info, "rectangle", None)
-                candidates.append((ct, name, auto_id, rect))
-            except Exception:
-                continue
         if candidates:
-            logger.info("发送按钮候选控件（共 %d 个，便于在 Cursor 中确认发送按钮）:", len(candidates))
-            for i, (ct, name, auto_id, rect) in enumerate(candidates[:30]):
+            logger.info("发送按钮候选控件（共 %d 个，便于在 Cursor 中确认发送按钮）:", total)
+            for i, (ct, name, auto_id, rect) in enumerate(candidates):
                 logger.info("  [%d] type=%s name=%r automation_id=%r rect=%s", i, ct, name or None, auto_id or None, rect)
-            if len(candidates) > 30:
-                logger.info("  ... 还有 %d 个未列出", len(candidates) - 30)
+            if total > limit:
+                logger.info("  ... 还有 %d 个未列出", total - limit)
     except Exception as e:
         logger.debug("dump 候选控件失败: %s", e)
 
@@ -355,32 +936,42 @@ def _find_and_click_send_button(wnd) -> bool:
     在 Cursor 窗口内查找“发送”按钮并点击。
     匹配 Button/Hyperlink/Image 的 name 或 automation_id 包含 send、submit、提交、发送、arrow 等。
     返回是否找到并点击成功。未找到时会 dump 候选控件到日志便于调试。
+    优先用 CacheRequest 一次取回全部候选及其属性；不可用时逐个控件读取属性。
     """
     if not _pywinauto_ok:
         return False
-    keywords = ("send", "submit", "提交", "发送", "arrow", "composer", "chat")
-    exclude = ("new", "create", "newchat", "新对话", "clear", "stop", "cancel")
-    # Cursor 可能是 Button，也可能是 Hyperlink/Image（图标按钮）
-    want_types = ("Button", "Hyperlink", "Image")
+    cached = None
+    if _uia_com_ok:
+        try:
+            cached = _find_all_cached(wnd, _SEND_BUTTON_TYPES)
+        except Exception as e:
+            logger.debug("CacheRequest 批量查找候选控件失败，改为逐个读取: %s", e)
+    looks_like_send_button = _looks_like_send_button
     try:
-        for ctrl in wnd.descendants():
-            try:
-                ct = ctrl.element_info.control_type
-                if ct not in want_types:
-                    continue
-                name = (getattr(ctrl.element_info, "name", None) or "") or ""
-                auto_id = (getattr(ctrl.element_info, "automation_id", None) or "") or ""
-                combined = (name + " " + auto_id).lower()
-                if any(n in combined for n in exclude):
+        if cached is not None:
+            for element, ct, name, auto_id, _rect in cached:
+                if not looks_like_send_button(name, auto_id):
                     continue
-                if any(kw in combined for kw in keywords):
-                    ctrl.click()
+                try:
+                    UIAWrapper(UIAElementInfo(element)).click()
                     logger.info("已点击发送按钮: type=%s name=%r automation_id=%r", ct, name or None, auto_id or None)
                     return True
-            except Exception:
-                continue
+                except Exception:
+                    continue
+        else:
+            for ctrl in _iter_controls(wnd, _SEND_BUTTON_TYPES):
+                try:
+                    ei = ctrl.element_info
+                    name = ei.name or ""
+                    auto_id = ei.automation_id or ""
+                    if looks_like_send_button(name, auto_id):
+                        ctrl.click()
+                        logger.info("已点击发送按钮: type=%s name=%r automation_id=%r", ei.control_type, name or None, auto_id or None)
+                        return True
+                except Exception:
+                    continue
         # 未找到时输出候选，方便在 Cursor 里对照界面确认发送按钮的 name/automation_id
-        _dump_send_candidates(wnd)
+        _dump_send_candidates(wnd, cached)
         return False
     except Exception as e:
         logger.debug("查找发送按钮失败: %s", e)
@@ -405,7 +996,7 @@ def _try_send(wnd) -> str:
         logger.debug("_try_send: Enter 发送异常: %s", e)
 
     # ── 方法 2: 配置热键（仅当热键不是单独的 Enter 时才尝试，避免重复） ──
-    send_keys = _parse_hotkey(config.CURSOR_SEND_HOTKEY)
+    send_keys = _SEND_KEYS
     if send_keys and send_keys != ["enter"]:
         try:
             time.sleep(0.3)
@@ -442,8 +1033,8 @@ def write_and_send(text: str, project_id: Optional[str] = None) -> dict[str, Any
     if not _pyautogui_ok:
         return {"ok": False, "error": "需要 pyautogui"}
 
-    # 是否包含非 ASCII（如中文）→ 必须用剪贴板粘贴
-    use_clipboard = any(ord(c) > 127 for c in text)
+    # 是否包含非 ASCII（如中文）：不能逐字键入，SetValue/SendInput 不可用时改用剪贴板粘贴
+    use_clipboard = not text.isascii()
 
     try:
         wnd = None
@@ -453,45 +1044,55 @@ def write_and_send(text: str, project_id: Optional[str] = None) -> dict[str, Any
             wnd = _find_cursor_window(project_id)
             if wnd:
                 wnd.set_focus()
-                time.sleep(0.3)
+                _wait_until(lambda: wnd.is_active(), 0.3)
 
         # ━━ 阶段2: 写入文本 ━━
         written = False
+        written_ctrl = None
 
         # 方式 A: 通过 UIA 找到输入控件，聚焦后粘贴/填写
         if _pywinauto_ok and wnd:
-            for ctrl in wnd.descendants():
+            for ctrl in _input_candidates(wnd, project_id):
                 try:
-                    if ctrl.element_info.control_type not in ("Edit", "Document"):
-                        continue
                     ctrl.set_focus()
-                    time.sleep(0.2)
-                    if use_clipboard and _pyperclip_ok:
+                    _wait_until(lambda: ctrl.has_keyboard_focus(), 0.2)
+                    # 优先 UIA SetValue（整体替换原内容、支持 Unicode），失败才走 SendInput（先全选再注入）/剪贴板/键盘
+                    if _set_value_verified(ctrl, text, _cached_value_pattern(project_id, ctrl)):
+                        pass
+                    elif (
+                        len(text) <= _SENDINPUT_MAX_CHARS
+                        and ctrl.has_keyboard_focus()
+                        and _send_unicode_string(text, select_all=True)
+                    ):
+                        pass
+                    elif use_clipboard and _clipboard_ok:
                         _paste_text_via_clipboard(text)
+                    elif hasattr(ctrl, "set_edit_text"):
+                        ctrl.set_edit_text(text)
                     else:
-                        if hasattr(ctrl, "set_value"):
-                            ctrl.set_value(text)
-                        elif hasattr(ctrl, "set_edit_text"):
-                            ctrl.set_edit_text(text)
-                        else:
-                            ctrl.type_keys(
-                                text.replace("}", "}}").replace("{", "{{"),
-                                with_spaces=True,
-                            )
+                        ctrl.type_keys(
+                            text.replace("}", "}}").replace("{", "{{"),
+                            with_spaces=True,
+                        )
                     written = True
+                    written_ctrl = ctrl
+                    _remember_input_ctrl(project_id, wnd, ctrl)
                     logger.info("write_and_send: 已通过 UIA 写入文本（长度=%d）", len(text))
                     break
                 except Exception as ex:
                     logger.debug("write_and_send: UIA 写入控件失败: %s", ex)
+                    _forget_input_ctrl(project_id, ctrl)
                     continue
 
         # 方式 B: 纯键盘备用（假设输入框已经有焦点）
         if not written and _pyautogui_ok:
             logger.info("write_and_send: UIA 未成功，改用纯键盘写入")
-            if use_clipboard and _pyperclip_ok:
+            if use_clipboard and _clipboard_ok:
                 _paste_text_via_clipboard(text)
+            elif len(text) <= _SENDINPUT_MAX_CHARS and _send_unicode_string(text):
+                pass
             else:
-                pyautogui.write(text, interval=0.02)
+                pyautogui.write(text, interval=0)
             written = True
 
         if not written:
@@ -499,8 +1100,12 @@ def write_and_send(text: str, project_id: Optional[str] = None) -> dict[str, Any
 
         # ━━ 阶段3: 发送 ━━
         # 关键：粘贴后 **不要** 重新 set_focus，焦点已经在输入框内；
-        # 只需等 UI 刷新后直接按键发送
-        time.sleep(0.5)
+        # 只需等 UI 刷新后直接按键发送。UIA 写入时等到输入框内容确实变为该文本（粘贴异步生效），否则固定等待
+        if written_ctrl is not None:
+            expected = _normalize_text(text)
+            _wait_until(lambda: _normalize_text(_get_control_text(written_ctrl)) == expected, 0.5)
+        else:
+            time.sleep(0.5)
 
         method = _try_send(wnd)
         if method:
@@ -24,6 +24,19 @@ import websockets
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 可选：orjson 编解码更快，未安装时回退到标准库 json
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps_pretty(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps_pretty(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
 CLIENTS = set()
 
 
@@ -32,9 +45,11 @@ async def handler(ws):
     logger.info("客户端已连接，当前数量: %d", len(CLIENTS))
     try:
         async for raw in ws:
+            if not logger.isEnabledFor(logging.INFO):
+                continue
             try:
-                msg = json.loads(raw)
-                logger.info("客户端回复: %s", json.dumps(msg, ensure_ascii=False, indent=2))
+                msg = _json_loads(raw)
+                logger.info("客户端回复: %s", _json_dumps_pretty(msg))
             except Exception:
                 logger.info("客户端回复(原始): %s", raw)
     finally:
@@ -42,27 +57,36 @@ async def handler(ws):
 
 
 async def interactive():
-    """从标准输入读 JSON 行，发送给第一个已连接的客户端（单客户端测试）。"""
+    """
+    从标准输入读 JSON 行，广播给所有已连接的客户端。
+    读取与发送分为两个任务，经有界队列衔接：读 stdin 不再被发送阻塞，队列满时反压读取。
+    """
     import sys
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     reader = asyncio.StreamReader()
     protocol = asyncio.StreamReaderProtocol(reader)
     await loop.connect_read_pipe(lambda: protocol, sys.stdin)
-    while True:
-        line = await reader.readline()
-        if not line:
-            break
-        line = line.decode("utf-8").strip()
-        if not line:
-            continue
-        for client in list(CLIENTS):
-            try:
-                await client.send(line)
-                break
-            except Exception as e:
-                logger.warning("发送失败: %s", e)
-        if not CLIENTS:
-            logger.warning("暂无客户端连接，请先运行 main.py")
+    queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+
+    async def read_lines():
+        while raw := await reader.readline():
+            line = raw.decode("utf-8").strip()
+            if line:
+                await queue.put(line)
+        await queue.put(None)  # 标准输入结束
+
+    async def dispatch():
+        while (line := await queue.get()) is not None:
+            clients = list(CLIENTS)
+            if not clients:
+                logger.warning("暂无客户端连接，请先运行 main.py")
+                continue
+            results = await asyncio.gather(*(c.send(line) for c in clients), return_exceptions=True)
+            for r in results:
+                if isinstance(r, Exception):
+                    logger.warning("发送失败: %s", r)
+
+    await asyncio.gather(read_lines(), dispatch())
 
 
 async def main():
@@ -5,9 +5,11 @@ WebSocket 客户端：连接后端，接收 JSON 命令并调用 cursor_controll
 """
 
 import asyncio
+import functools
 import json
 import logging
-from typing import Any, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
 import websockets
 from websockets.exceptions import ConnectionClosed
@@ -15,45 +17,57 @@ from websockets.exceptions import ConnectionClosed
 import config
 import cursor_controller as ctrl
 
+# 可选：orjson 编解码更快，未安装时回退到标准库 json。发送仍用文本帧（str），与后端协议保持一致
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
+# 按命令类型划分线程池：
+# - UIA 操作固定在单线程上串行执行（该线程与 pywinauto 同在 MTA，缓存的窗口/控件只在此线程上使用）
+# - 文件/启动进程等 IO 操作另用线程池，不占用 UIA 线程
+# 同一连接上的消息按到达顺序逐条处理（见 run_client），线程池划分不改变命令的执行顺序
+_EXEC_UIA = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cursor-uia", initializer=ctrl.init_uia_thread)
+_EXEC_IO = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cursor-io")
+
 
-def _run_sync(fn, *args, **kwargs) -> Any:
-    """在默认线程池中执行同步函数，供 async 调用。"""
-    loop = asyncio.get_event_loop()
-    return loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+async def _run_sync(fn, *args, executor: Optional[Executor] = _EXEC_IO, **kwargs) -> Any:
+    """在线程池中执行同步函数，供 async 调用。默认使用 IO 线程池；executor 为 None 时用 asyncio.to_thread。"""
+    if executor is None:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+# cmd -> (controller 函数, 依次传入的 (参数名, 默认值), 执行所用线程池)
+_DISPATCH: dict[str, tuple[Callable[..., dict[str, Any]], tuple[tuple[str, Any], ...], Executor]] = {
+    "create_folder": (ctrl.create_folder, (("path", ""), ("projectId", None), ("projectName", None)), _EXEC_IO),
+    "open_cursor": (ctrl.open_cursor, (("path", ""), ("projectId", None)), _EXEC_IO),
+    "get_input_state": (ctrl.get_input_state, (("projectId", None),), _EXEC_UIA),
+    "write_and_send": (ctrl.write_and_send, (("text", ""), ("projectId", None)), _EXEC_UIA),
+    "open_new_agent": (ctrl.open_new_agent, (("projectId", None),), _EXEC_UIA),
+}
 
 
 async def handle_command(cmd: str, params: Optional[dict] = None) -> dict[str, Any]:
-    """根据 cmd 调用 controller 并返回统一格式的 data。"""
+    """根据 cmd 查分发表调用 controller 并返回统一格式的 data。"""
     params = params or {}
-    try:
-        if cmd == "create_folder":
-            path = params.get("path", "")
-            project_id = params.get("projectId")
-            project_name = params.get("projectName")
-            result = await _run_sync(ctrl.create_folder, path, project_id, project_name)
-            return result
-        if cmd == "open_cursor":
-            path = params.get("path", "")
-            project_id = params.get("projectId")
-            result = await _run_sync(ctrl.open_cursor, path, project_id)
-            return result
-        if cmd == "get_input_state":
-            project_id = params.get("projectId")
-            result = await _run_sync(ctrl.get_input_state, project_id)
-            return result
-        if cmd == "write_and_send":
-            text = params.get("text", "")
-            project_id = params.get("projectId")
-            result = await _run_sync(ctrl.write_and_send, text, project_id)
-            return result
-        if cmd == "open_new_agent":
-            project_id = params.get("projectId")
-            result = await _run_sync(ctrl.open_new_agent, project_id)
-            return result
+    entry = _DISPATCH.get(cmd)
+    if entry is None:
         return {"ok": False, "error": f"未知命令: {cmd}"}
+    fn, keys, executor = entry
+    try:
+        return await _run_sync(fn, *(params.get(k, default) for k, default in keys), executor=executor)
     except Exception as e:
         logger.exception("执行命令异常")
         return {"ok": False, "error": str(e)}
@@ -71,9 +85,9 @@ async def process_message(ws, raw: str) -> None:
     """解析一条后端消息，执行命令并回写一条 JSON。"""
     logger.info("[收到] %s", raw)
     try:
-        msg = json.loads(raw)
+        msg = _json_loads(raw)
     except json.JSONDecodeError as e:
-        out = json.dumps({"type": "error", "data": {"error": f"JSON 解析失败: {e}"}}, ensure_ascii=False)
+        out = _json_dumps({"type": "error", "data": {"error": f"JSON 解析失败: {e}"}})
         logger.info("[发送] %s", out)
         await ws.send(out)
         return
@@ -85,16 +99,20 @@ async def process_message(ws, raw: str) -> None:
         logger.debug("忽略无 cmd 的消息，不向后台发送错误")
         return
     data = await handle_command(cmd, params)
-    out = json.dumps(_response_payload(msg_id, "result", data, project_id), ensure_ascii=False)
+    out = _json_dumps(_response_payload(msg_id, "result", data, project_id))
     logger.info("[发送] %s", out)
     await ws.send(out)
 
 
-async def run_client():
-    """连接后端 WebSocket：ws://<后端地址>/ws/ai-tool，无需登录与 token、无需 projectId。"""
+async def run_client(url_provider: Callable[[], str] = config.get_ws_url):
+    """
+    连接后端 WebSocket：ws://<后端地址>/ws/ai-tool，无需登录与 token、无需 projectId。
+    url_provider 仅在每次（重）连接时调用一次取地址，默认 config.get_ws_url；也可传 auth.make_ws_url_provider(...)。
+    消息按到达顺序逐条处理、逐条回复：如 open_cursor 之后的 write_and_send 能看到其登记的 projectId→窗口映射。
+    """
     while True:
         try:
-            url = config.get_ws_url()
+            url = url_provider()
             if not url or not url.replace("ws://", "").replace("wss://", "").strip():
                 logger.warning("未配置 CURSOR_WS_URL 或 CURSOR_BACKEND_ADDRESS，%s 秒后重试...", config.RECONNECT_INTERVAL)
                 await asyncio.sleep(config.RECONNECT_INTERVAL)